@@ -2,26 +2,64 @@
 import os
 import random
 import secrets
+import hashlib
+import gzip
+import multiprocessing
+import zlib
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response
+from flask import Flask, render_template, stream_template, request, redirect, url_for, session, flash, make_response, g, get_flashed_messages
 import sqlite3
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from functools import wraps
 from flask_mail import Mail, Message
 from dotenv import load_dotenv
+import thumbnails
+
+try:
+    import brotli  # optional: without it responses are gzip-only
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
-app.secret_key = "super-secret-key"  # change this
 
 load_dotenv()
 
-UPLOAD_FOLDER = 'static/uploads'
+app.secret_key = os.getenv("SECRET_KEY", "super-secret-key")  # set SECRET_KEY in .env
+
+UPLOAD_FOLDER = 'static/uploads'  # default site; each site can set its own
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Multi-site config: one JSON file lists every site this process serves
+app.config['SITES_CONFIG'] = os.getenv("SITES_CONFIG", "sites.json")
+app.config['DB_POOL_SIZE'] = int(os.getenv("DB_POOL_SIZE", "5"))
+app.config['CACHE_MAX_BYTES'] = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # shared by all sites
+app.config['CACHE_TTL'] = int(os.getenv("CACHE_TTL", "30"))  # seconds; bounds staleness across workers
+
+# Server-side admin sessions
+app.config['SESSION_LIFETIME'] = int(os.getenv("SESSION_LIFETIME", str(8 * 60 * 60)))  # seconds
+app.config['SESSION_CACHE_SIZE'] = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+app.config['SESSION_SWEEP_INTERVAL'] = int(os.getenv("SESSION_SWEEP_INTERVAL", "600"))  # seconds
+
+# Response compression (gzip, plus brotli when installed)
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; smaller bodies go out as-is
+app.config['COMPRESS_LEVEL'] = int(os.getenv("COMPRESS_LEVEL", "6"))  # gzip, 1-9
+app.config['COMPRESS_BR_LEVEL'] = int(os.getenv("COMPRESS_BR_LEVEL", "4"))  # brotli, 0-11
+app.config['COMPRESS_STREAM_CHUNK'] = int(os.getenv("COMPRESS_STREAM_CHUNK", "8192"))  # bytes per flushed block
+app.config['COMPRESS_MIMETYPES'] = {'text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript'}
+
+# Background image optimization
+app.config['IMAGE_WORKERS'] = int(os.getenv("IMAGE_WORKERS", "0"))  # 0 = one per available core
+app.config['IMAGE_JOB_BATCH'] = int(os.getenv("IMAGE_JOB_BATCH", "16"))  # images submitted per round
+app.config['IMAGE_JOB_LEASE'] = int(os.getenv("IMAGE_JOB_LEASE", "120"))  # seconds before a silent job can be resumed
+app.config['IMAGE_JOB_MAX_ATTEMPTS'] = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "3"))  # worker crashes before an image is failed
 
 # Mail config
 app.config['MAIL_SERVER'] = os.getenv("MAIL_SERVER")
@@ -36,9 +74,549 @@ mail = Mail(app)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# === SITES ===
+class Site:
+    """One hosted client site: its hostnames, database, uploads and branding."""
+
+    def __init__(self, name, hosts, database='blog.db', upload_folder=UPLOAD_FOLDER,
+                 brand_name='RJ Asis Web Services', owner_name='Randiel James Z. Asis',
+                 contact_email='randielasis15@gmail.com', contact_phone='0938-082-8470',
+                 linkedin_url='https://www.linkedin.com/in/randiel-james-asis-6699882ba/'):
+        self.name = name
+        self.hosts = [h.lower() for h in hosts]
+        self.database = database
+        self.upload_folder = check_upload_folder(upload_folder)
+        self.brand_name = brand_name
+        self.owner_name = owner_name
+        self.contact_email = contact_email
+        self.contact_phone = contact_phone
+        self.linkedin_url = linkedin_url
+        self.pool = ConnectionPool(database, app.config['DB_POOL_SIZE'])
+
+    def upload_url(self, filename):
+        return f"/{self.upload_folder}/{filename}"
+
+def check_upload_folder(folder):
+    """Uploads are served by the static route, so the folder must be a relative path under static/."""
+    normalized = os.path.normpath(folder).replace(os.sep, '/')
+    if os.path.isabs(folder) or normalized.split('/')[0] != 'static' or '..' in normalized.split('/'):
+        raise ValueError(f"upload_folder {folder!r} must be a relative path under static/ (e.g. static/uploads/my-site)")
+    return normalized
+
+def load_sites():
+    """Read sites from SITES_CONFIG, or fall back to the single site named in CNAME."""
+    path = app.config['SITES_CONFIG']
+    if os.path.exists(path):
+        with open(path) as f:
+            return [Site(**entry) for entry in json.load(f)['sites']]
+
+    hosts = ['localhost', '127.0.0.1']
+    if os.path.exists('CNAME'):
+        with open('CNAME') as f:
+            hosts.insert(0, f.read().strip())
+    return [Site('default', hosts)]
+
+def add_site(site):
+    """Start serving a site at runtime (tests and query_plans.py use throwaway ones)."""
+    SITES.append(site)
+    for host in site.hosts:
+        SITES_BY_HOST[host] = site
+
+def remove_site(site):
+    """Stop serving a site and drop everything this process holds for it."""
+    SITES.remove(site)
+    for host in site.hosts:
+        if SITES_BY_HOST.get(host) is site:
+            del SITES_BY_HOST[host]
+    site_cache.invalidate(site.name)
+    session_store.forget_site(site.name)
+    site.pool.close_all()
+
+def get_site():
+    """Pick the site for this request from its Host header (first site is the fallback)."""
+    host = request.host.split(':')[0].lower()
+    return SITES_BY_HOST.get(host, SITES[0])
+
+# === DATABASE CONNECTION POOL ===
+class ConnectionPool:
+    """Reuses SQLite connections for one database file across requests."""
+
+    def __init__(self, database, size):
+        self.database = database
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.trace = None  # optional callback given every SQL statement (see query_plans.py)
+
+    def connect(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.set_trace_callback(self.trace)
+        return PooledConnection(self, conn)
+
+    def close_all(self):
+        """Close the idle connections (e.g. before deleting a temporary database)."""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def release(self, conn):
+        conn.rollback()  # never hand out a connection with an open transaction
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+class PooledConnection:
+    """sqlite3 connection whose close() returns it to the pool instead."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+def connect_db():
+    return g.site.pool.connect()
+
+# === CONTENT CACHE ===
+class SiteCache:
+    """LRU cache shared by all sites, bounded by an approximate memory budget."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (site, namespace, key) -> (expires, size, value)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, site, namespace, key):
+        with self.lock:
+            entry = self.entries.get((site, namespace, key))
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove((site, namespace, key))
+                return None
+            self.entries.move_to_end((site, namespace, key))
+            return entry[2]
+
+    def set(self, site, namespace, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self._remove((site, namespace, key))
+            self.entries[(site, namespace, key)] = (time.monotonic() + self.ttl, size, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, site):
+        with self.lock:
+            for cache_key in [k for k in self.entries if k[0] == site]:
+                self._remove(cache_key)
+
+    def _remove(self, cache_key):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+site_cache = SiteCache(app.config['CACHE_MAX_BYTES'], app.config['CACHE_TTL'])
+
+def cached(namespace, key, load):
+    """Return a cached value for the current site, calling load() on a miss."""
+    value = site_cache.get(g.site.name, namespace, key)
+    if value is None:
+        value = load()
+        site_cache.set(g.site.name, namespace, key, value, len(repr(value)))
+    return value
+
+def cached_page(key, render):
+    """Cache a rendered public page unless there are flash messages to show."""
+    if '_flashes' in session:
+        return render()
+    return cached('page', key, render)
+
+def invalidate_cache():
+    site_cache.invalidate(g.site.name)
+
+# === ADMIN SESSIONS ===
+class SessionStore:
+    """Admin sessions kept in each site's `sessions` table, fronted by an in-memory LRU.
+
+    The browser only holds an opaque session id; the table stores its SHA-256 hash.
+    A cached entry is only trusted while the site's session_epoch is unchanged; triggers
+    bump it whenever a session row is deleted or a user renamed or removed, so a revocation
+    committed by any worker process is seen on the next request. Other writes keep the cache.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (site, hash) -> (epoch, expires_at, user_id, username)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _hash(sid):
+        return hashlib.sha256(sid.encode()).hexdigest()
+
+    def create(self, user_id):
+        sid = secrets.token_urlsafe(32)
+        now = time.time()
+        conn = connect_db()
+        c = conn.cursor()
+        c.execute("INSERT INTO sessions (id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                  (self._hash(sid), user_id, now, now + app.config['SESSION_LIFETIME']))
+        conn.commit()
+        conn.close()
+        return sid
+
+    def get(self, sid):
+        """Return (user_id, username) for a live session id, or None."""
+        key = (g.site.name, self._hash(sid))
+        now = time.time()
+        conn = connect_db()
+        c = conn.cursor()
+        c.execute("SELECT epoch FROM session_epoch WHERE id = 1")  # before the lookup, so a revocation in between forces a re-check
+        epoch = c.fetchone()[0]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == epoch and entry[1] > now:
+                self.entries.move_to_end(key)
+                conn.close()
+                return entry[2], entry[3]
+
+        c.execute("""SELECT s.expires_at, s.user_id, u.username FROM sessions s
+                     JOIN admin_user u ON u.id = s.user_id
+                     WHERE s.id = ? AND s.expires_at > ?""", (key[1], now))
+        row = c.fetchone()
+        conn.close()
+
+        with self.lock:
+            if row is None:
+                self.entries.pop(key, None)
+                return None
+            self.entries[key] = (epoch,) + row
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return row[1], row[2]
+
+    def revoke(self, sid):
+        key = (g.site.name, self._hash(sid))
+        conn = connect_db()
+        c = conn.cursor()
+        c.execute("DELETE FROM sessions WHERE id = ?", (key[1],))
+        conn.commit()
+        conn.close()
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def revoke_user(self, user_id, keep=None):
+        """Drop every session of a user (except `keep`, e.g. the one making the change)."""
+        keep_hash = self._hash(keep) if keep else ''
+        conn = connect_db()
+        c = conn.cursor()
+        c.execute("DELETE FROM sessions WHERE user_id = ? AND id != ?", (user_id, keep_hash))
+        conn.commit()
+        conn.close()
+        with self.lock:
+            for key in [k for k, v in self.entries.items()
+                        if k[0] == g.site.name and v[2] == user_id and k[1] != keep_hash]:
+                del self.entries[key]
+
+    def forget(self, sid):
+        """Evict a cached entry so the next lookup re-reads it (e.g. after a rename)."""
+        with self.lock:
+            self.entries.pop((g.site.name, self._hash(sid)), None)
+
+    def forget_site(self, site_name):
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == site_name]:
+                del self.entries[key]
+
+    def sweep(self):
+        """Delete expired sessions from every site's database and the cache."""
+        now = time.time()
+        for site in SITES:
+            conn = site.pool.connect()
+            c = conn.cursor()
+            c.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.commit()
+            conn.close()
+        with self.lock:
+            for key in [k for k, v in self.entries.items() if v[1] <= now]:
+                del self.entries[key]
+
+session_store = SessionStore(app.config['SESSION_CACHE_SIZE'])
+
+def sweep_sessions_forever():
+    while True:
+        time.sleep(app.config['SESSION_SWEEP_INTERVAL'])
+        try:
+            session_store.sweep()
+        except sqlite3.Error as e:
+            app.logger.warning("Session sweep failed: %s", e)
+
+# === RESPONSE COMPRESSION ===
+def choose_encoding():
+    """Pick brotli or gzip from Accept-Encoding, or None if the client wants neither."""
+    accept = request.accept_encodings
+    br, gz = accept.quality('br'), accept.quality('gzip')
+    if brotli is not None and br > 0 and br >= gz:
+        return 'br'
+    if gz > 0:
+        return 'gzip'
+    return None
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'])
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body, flushing a block every COMPRESS_STREAM_CHUNK bytes."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config['COMPRESS_BR_LEVEL'])
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)  # 31 = gzip header
+        process, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    block_size = app.config['COMPRESS_STREAM_CHUNK']
+    pending = bytearray()
+    try:
+        for chunk in chunks:
+            pending += chunk.encode() if isinstance(chunk, str) else chunk
+            if len(pending) >= block_size:
+                yield process(bytes(pending)) + flush()
+                pending.clear()
+        yield process(bytes(pending)) + finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough  # static files
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# === STREAMED PAGES ===
+def stream_page(template, **context):
+    """Send a list-heavy page while it renders instead of building it in memory first."""
+    get_flashed_messages()  # pop flashes now, while the session cookie can still be saved
+    return stream_template(template, **context)
+
+def iter_rows(query, params=()):
+    """Yield query rows one at a time.
+
+    The connection is only taken from the pool once the template starts iterating,
+    so a page that skips the loop never holds one.
+    """
+    conn = connect_db()
+    try:
+        c = conn.cursor()
+        c.execute(query, params)
+        yield from c
+    finally:
+        conn.close()
+
+# === IMAGE OPTIMIZATION JOBS ===
+image_executor = None
+image_executor_lock = threading.Lock()
+
+def get_image_executor():
+    global image_executor
+    with image_executor_lock:
+        if image_executor is None:
+            workers = app.config['IMAGE_WORKERS']
+            if not workers:
+                workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+            # spawn, not fork: forking this multi-threaded process can copy a held lock into the child
+            image_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return image_executor
+
+def reset_image_executor(broken):
+    """Drop a pool whose worker died, so the next get_image_executor() starts a new one."""
+    global image_executor
+    with image_executor_lock:
+        if image_executor is broken:  # another job may have replaced it already
+            image_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def create_image_job(site, post_id=None):
+    """Queue every unoptimized post image (or just one post's) and return the job id, or None."""
+    prefix = site.upload_url('')
+    optimized_prefix = site.upload_url('optimized/')
+    query = """SELECT id, image_url FROM posts
+               WHERE substr(image_url, 1, ?) = ? AND substr(image_url, 1, ?) != ?
+               AND NOT EXISTS (SELECT 1 FROM image_job_items i
+                               WHERE i.post_id = posts.id AND i.source_url = posts.image_url
+                               AND i.status != 'done')"""  # skip queued and known-bad images
+    params = [len(prefix), prefix, len(optimized_prefix), optimized_prefix]
+    if post_id is not None:
+        query += " AND id = ?"
+        params.append(post_id)
+
+    conn = site.pool.connect()
+    c = conn.cursor()
+    c.execute(query, params)
+    items = c.fetchall()
+    if not items:
+        conn.close()
+        return None
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c.execute("INSERT INTO image_jobs (status, total, created_at, updated_at) VALUES ('queued', ?, ?, ?)",
+              (len(items), now, now))
+    job_id = c.lastrowid
+    c.executemany("INSERT INTO image_job_items (job_id, post_id, source_url) VALUES (?, ?, ?)",
+                  [(job_id, post, url) for post, url in items])
+    conn.commit()
+    conn.close()
+    return job_id
+
+def start_image_job(site, job_id):
+    threading.Thread(target=run_image_job, args=(site, job_id), daemon=True).start()
+
+def run_image_job(site, job_id):
+    """Process a job's pending items in batches, swapping each post's URLs as its image finishes."""
+    conn = site.pool.connect()
+    c = conn.cursor()
+    lease = app.config['IMAGE_JOB_LEASE']
+
+    # Claim the job; another thread or process may already own it
+    c.execute("""UPDATE image_jobs SET status = 'running', claimed_until = ?
+                 WHERE id = ? AND status IN ('queued', 'running')
+                 AND (claimed_until IS NULL OR claimed_until < ?)""",
+              (time.time() + lease, job_id, time.time()))
+    conn.commit()
+    if c.rowcount != 1:
+        conn.close()
+        return
+
+    output_dir = os.path.abspath(os.path.join(site.upload_folder, 'optimized'))
+    try:
+        while True:
+            # Images that were in flight when a worker died too often are given up on
+            c.execute("""UPDATE image_job_items SET status = 'failed', error = 'image worker crashed'
+                         WHERE job_id = ? AND status = 'pending' AND attempts >= ?""",
+                      (job_id, app.config['IMAGE_JOB_MAX_ATTEMPTS']))
+            if c.rowcount > 0:
+                c.execute("UPDATE image_jobs SET failed = failed + ? WHERE id = ?", (c.rowcount, job_id))
+                conn.commit()
+
+            c.execute("""SELECT post_id, source_url, attempts FROM image_job_items
+                         WHERE job_id = ? AND status = 'pending' ORDER BY attempts DESC LIMIT ?""",
+                      (job_id, app.config['IMAGE_JOB_BATCH']))
+            batch = c.fetchall()
+            if not batch:
+                break
+            if batch[0][2] > 0:
+                batch = batch[:1]  # survived a worker crash; run it alone to find the image that causes it
+
+            executor = get_image_executor()
+            futures = {}
+            try:
+                for post_id, url, attempts in batch:
+                    futures[executor.submit(thumbnails.optimize_image, os.path.abspath(url.lstrip('/')), output_dir)] = (post_id, url)
+                for future in as_completed(list(futures)):
+                    post_id, source_url = futures[future]
+                    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    try:
+                        files = future.result()
+                    except BrokenProcessPool:
+                        raise  # not this image's fault; handled below
+                    except Exception as e:
+                        c.execute("UPDATE image_job_items SET status = 'failed', error = ? WHERE job_id = ? AND post_id = ?",
+                                  (str(e)[:200], job_id, post_id))
+                        c.execute("UPDATE image_jobs SET failed = failed + 1, updated_at = ?, claimed_until = ? WHERE id = ?",
+                                  (now, time.time() + lease, job_id))
+                    else:
+                        image_url = site.upload_url('optimized/' + files['display'])
+                        # Only swap if the post still points at the image we optimized
+                        c.execute("UPDATE posts SET image_url = ?, thumb_url = ? WHERE id = ? AND image_url = ?",
+                                  (image_url, site.upload_url('optimized/' + files['thumb']), post_id, source_url))
+                        c.execute("UPDATE image_job_items SET status = 'done', result_url = ? WHERE job_id = ? AND post_id = ?",
+                                  (image_url, job_id, post_id))
+                        c.execute("UPDATE image_jobs SET done = done + 1, updated_at = ?, claimed_until = ? WHERE id = ?",
+                                  (now, time.time() + lease, job_id))
+                    conn.commit()  # swap + progress land together
+                    del futures[future]
+            except BrokenProcessPool:
+                # A worker died (out of memory, a crash inside Pillow); everything still in flight stays pending
+                reset_image_executor(executor)
+                c.executemany("UPDATE image_job_items SET attempts = attempts + 1 WHERE job_id = ? AND post_id = ?",
+                              [(job_id, post_id) for post_id, url in futures.values()])
+                conn.commit()
+
+        c.execute("UPDATE image_jobs SET status = 'done', claimed_until = NULL, updated_at = ? WHERE id = ?",
+                  (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+        conn.commit()
+    except Exception:
+        app.logger.exception("Image job %s stopped; it is restarted once its lease expires", job_id)
+    finally:
+        conn.close()
+
+def resume_image_jobs(site):
+    """Restart the site's unfinished jobs whose runner stopped (lease expired or never claimed)."""
+    if thumbnails.Image is None:
+        return
+    conn = site.pool.connect()
+    c = conn.cursor()
+    c.execute("SELECT id FROM image_jobs WHERE status IN ('queued', 'running') AND (claimed_until IS NULL OR claimed_until < ?)",
+              (time.time(),))
+    job_ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    for job_id in job_ids:
+        start_image_job(site, job_id)
+
+def resume_image_jobs_forever():
+    while True:
+        for site in SITES:
+            try:
+                resume_image_jobs(site)
+            except sqlite3.Error as e:
+                app.logger.warning("Resuming image jobs for %s failed: %s", site.name, e)
+        time.sleep(app.config['IMAGE_JOB_LEASE'])
+
+# Save an uploaded image into the current site's upload folder, returning its URL
+def save_upload(file):
+    if file and file.filename != '' and allowed_file(file.filename):
+        filename = secure_filename(file.filename)
+        file.save(os.path.join(g.site.upload_folder, filename))
+        return g.site.upload_url(filename)
+    return None
+
 # Database initialization + Image Support
-def init_db():
-    conn = sqlite3.connect('blog.db')
+def init_db(database='blog.db'):
+    conn = sqlite3.connect(database)
     c = conn.cursor()
     
     # Blog posts table (with image_url)
@@ -61,8 +639,19 @@ def init_db():
               message TEXT NOT NULL,
               timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
               read_status INTEGER DEFAULT 0)''')  # 0 = unread, 1 = read
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contact_messages_timestamp ON contact_messages (timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contact_messages_read_status ON contact_messages (read_status)")
     
 
+    # Server-side admin sessions (id is a SHA-256 hash of the cookie value)
+    c.execute('''CREATE TABLE IF NOT EXISTS sessions
+                 (id TEXT PRIMARY KEY,
+                  user_id INTEGER NOT NULL,
+                  created_at REAL NOT NULL,
+                  expires_at REAL NOT NULL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+
     # Admin user table (WITH EMAIL + VERIFICATION)
     c.execute('''CREATE TABLE IF NOT EXISTS admin_user
                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -72,6 +661,19 @@ def init_db():
                 verification_token TEXT,
                 password_hash TEXT NOT NULL)''')
 
+    # Revocation counter checked by every worker's session cache (see SessionStore)
+    c.execute('''CREATE TABLE IF NOT EXISTS session_epoch
+                 (id INTEGER PRIMARY KEY CHECK (id = 1),
+                  epoch INTEGER NOT NULL)''')
+    c.execute("INSERT OR IGNORE INTO session_epoch (id, epoch) VALUES (1, 0)")
+    c.execute('''CREATE TRIGGER IF NOT EXISTS session_epoch_session_deleted AFTER DELETE ON sessions
+                 BEGIN UPDATE session_epoch SET epoch = epoch + 1 WHERE id = 1; END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS session_epoch_user_deleted AFTER DELETE ON admin_user
+                 BEGIN UPDATE session_epoch SET epoch = epoch + 1 WHERE id = 1; END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS session_epoch_user_renamed AFTER UPDATE OF username ON admin_user
+                 WHEN OLD.username != NEW.username
+                 BEGIN UPDATE session_epoch SET epoch = epoch + 1 WHERE id = 1; END''')
+
 
     # Create default admin if not exists
     c.execute("SELECT COUNT(*) FROM admin_user")
@@ -90,23 +692,46 @@ def init_db():
         ('home_value', 'Our value proposition: Affordable, reliable services tailored for small businesses. Get started today!'),
         ('about_story', 'Founded by Randiel James Z. Asis, we specialize in web development and IT support since 2025.'),
         ('about_team', '• Randiel James Z. Asis - Web Developer & IT Specialist'),
-        ('service1_title', 'Basic Website Development'),
-        ('service1_desc', 'Up to 5 pages, mobile-responsive, contact form, basic SEO.'),
-        ('service1_price', '₱20,000 (One-time, Negotiable)'),
-        ('service2_title', 'Email Setup & Management'),
-        ('service2_desc', 'Professional emails, configuration, spam filtering, ongoing support.'),
-        ('service2_price', 'Included in Monthly Fee'),
-        ('service3_title', 'Website Maintenance'),
-        ('service3_desc', 'Updates, backups, security, performance monitoring.'),
-        ('service3_price', '₱5,000 / Month'),
         ('home_image', ''),  # Placeholder for uploaded hero image
-        ('service1_image', ''),
-        ('service2_image', ''),
-        ('service3_image', ''),
     ]
     
     for key, value in defaults:
         c.execute("INSERT OR IGNORE INTO page_content (key, value) VALUES (?, ?)", (key, value))
+
+    # Services catalog table (replaces the fixed serviceN_* keys)
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='services'")
+    services_exists = c.fetchone() is not None
+    c.execute('''CREATE TABLE IF NOT EXISTS services
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  title TEXT NOT NULL,
+                  description TEXT NOT NULL,
+                  price TEXT NOT NULL,
+                  image_url TEXT,
+                  position INTEGER NOT NULL DEFAULT 0,
+                  visible INTEGER NOT NULL DEFAULT 1)''')  # 0 = hidden, 1 = shown
+    c.execute("CREATE INDEX IF NOT EXISTS idx_services_visible_position ON services (visible, position)")
+
+    # Move old serviceN_* keys into the services table (safe migration)
+    if not services_exists:
+        c.execute("SELECT key, value FROM page_content WHERE key LIKE 'service%'")
+        legacy = dict(c.fetchall())
+        services = []
+        i = 1
+        while f'service{i}_title' in legacy:
+            services.append((legacy[f'service{i}_title'],
+                             legacy.get(f'service{i}_desc', ''),
+                             legacy.get(f'service{i}_price', ''),
+                             legacy.get(f'service{i}_image') or None,
+                             i))
+            i += 1
+        if not services:
+            services = [
+                ('Basic Website Development', 'Up to 5 pages, mobile-responsive, contact form, basic SEO.', '₱20,000 (One-time, Negotiable)', None, 1),
+                ('Email Setup & Management', 'Professional emails, configuration, spam filtering, ongoing support.', 'Included in Monthly Fee', None, 2),
+                ('Website Maintenance', 'Updates, backups, security, performance monitoring.', '₱5,000 / Month', None, 3),
+            ]
+        c.executemany("INSERT INTO services (title, description, price, image_url, position) VALUES (?, ?, ?, ?, ?)", services)
+    c.execute("DELETE FROM page_content WHERE key GLOB 'service[0-9]*_*'")
     
     # Add image_url column if missing (safe migration)
     try:
@@ -114,11 +739,46 @@ def init_db():
     except sqlite3.OperationalError:
         pass  # Column already exists
 
+    # Add thumb_url column if missing (safe migration)
+    try:
+        c.execute("ALTER TABLE posts ADD COLUMN thumb_url TEXT")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    # Background image optimization jobs; items make them resumable
+    c.execute('''CREATE TABLE IF NOT EXISTS image_jobs
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  status TEXT NOT NULL DEFAULT 'queued',
+                  total INTEGER NOT NULL DEFAULT 0,
+                  done INTEGER NOT NULL DEFAULT 0,
+                  failed INTEGER NOT NULL DEFAULT 0,
+                  created_at TEXT NOT NULL,
+                  updated_at TEXT NOT NULL,
+                  claimed_until REAL)''')  # queued, running, done
+    c.execute('''CREATE TABLE IF NOT EXISTS image_job_items
+                 (job_id INTEGER NOT NULL,
+                  post_id INTEGER NOT NULL,
+                  source_url TEXT NOT NULL,
+                  status TEXT NOT NULL DEFAULT 'pending',
+                  result_url TEXT,
+                  error TEXT,
+                  PRIMARY KEY (job_id, post_id))''')  # pending, done, failed
+    # Add attempts column if missing (safe migration); counts worker crashes while in flight
+    try:
+        c.execute("ALTER TABLE image_job_items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    c.execute("CREATE INDEX IF NOT EXISTS idx_image_jobs_status ON image_jobs (status)")
+    c.execute("DROP INDEX IF EXISTS idx_image_job_items_status")  # replaced by the post_id index
+    c.execute("CREATE INDEX IF NOT EXISTS idx_image_job_items_post_id ON image_job_items (post_id)")
+
     # Add verification_token column if missing (safe migration)
     try:
         c.execute("ALTER TABLE admin_user ADD COLUMN verification_token TEXT")
     except sqlite3.OperationalError:
         pass  # Column already exists
+    c.execute("CREATE INDEX IF NOT EXISTS idx_admin_user_verification_token ON admin_user (verification_token)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_admin_user_email ON admin_user (email)")
     
     # Sample blog posts
     c.execute("SELECT COUNT(*) FROM posts")
@@ -132,7 +792,29 @@ def init_db():
     conn.commit()
     conn.close()
 
-init_db()  # This runs every time — safe and adds image support automatically
+SITES = load_sites()
+SITES_BY_HOST = {host: site for site in SITES for host in site.hosts}
+
+def init_site(site):
+    os.makedirs(site.upload_folder, exist_ok=True)  # Ensure upload folder exists
+    os.makedirs(os.path.dirname(site.database) or '.', exist_ok=True)  # e.g. sites/client-a.db
+    init_db(site.database)  # This runs every time — safe and adds image support automatically
+
+for site in SITES:
+    init_site(site)
+
+# Image worker processes are spawned and re-import this module; only the web process runs these
+if multiprocessing.parent_process() is None:
+    threading.Thread(target=sweep_sessions_forever, daemon=True).start()
+    threading.Thread(target=resume_image_jobs_forever, daemon=True).start()
+
+@app.before_request
+def select_site():
+    g.site = get_site()
+
+@app.context_processor
+def inject_site():
+    return {'site': g.site}
 
 # Email verification code sender
 def send_verification_email(email, token):
@@ -150,7 +832,7 @@ Thank you for registering. Please click the link below to verify your email addr
 
 If you did not request this, please ignore this email.
 
-— RJ Web Services
+— {g.site.brand_name}
 """
     mail.send(msg)
 
@@ -159,7 +841,7 @@ If you did not request this, please ignore this email.
 
 @app.route('/verify-email/<token>')
 def verify_email(token):
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
     c.execute("SELECT id FROM admin_user WHERE verification_token = ?", (token,))
     user = c.fetchone()
@@ -175,21 +857,42 @@ def verify_email(token):
     return redirect(url_for('admin_login'))
 
 
-# Helper to get page content
+# Helper to get page content (all keys are loaded and cached together per site)
+def load_content():
+    conn = connect_db()
+    c = conn.cursor()
+    c.execute("SELECT key, value FROM page_content")
+    result = dict(c.fetchall())
+    conn.close()
+    return result
+
 def get_content(key, default=""):
-    conn = sqlite3.connect('blog.db')
+    return cached('content', 'all', load_content).get(key, default)
+
+# Helper to get the services catalog in display order (one indexed query)
+def get_services():
+    return cached('services', 'visible', lambda: load_services(include_hidden=False))
+
+def load_services(include_hidden=False):
+    conn = connect_db()
     c = conn.cursor()
-    c.execute("SELECT value FROM page_content WHERE key=?", (key,))
-    result = c.fetchone()
+    if include_hidden:
+        c.execute("SELECT id, title, description, price, image_url, position, visible FROM services ORDER BY position, id")
+    else:
+        c.execute("SELECT id, title, description, price, image_url, position, visible FROM services WHERE visible = 1 ORDER BY position, id")
+    result = c.fetchall()
     conn.close()
-    return result[0] if result else default
+    return result
 
 # Admin decorator
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        if 'logged_in' not in session:
+        user = session_store.get(session['sid']) if 'sid' in session else None
+        if user is None:
+            session.pop('sid', None)
             return redirect(url_for('admin_login'))
+        g.admin_user_id, g.admin_username = user
         return f(*args, **kwargs)
     return decorated
 
@@ -207,33 +910,21 @@ def no_cache(f):
 # === PUBLIC ROUTES ===
 @app.route('/')
 def home():
-    return render_template('home.html',
+    return cached_page('home', lambda: render_template('home.html',
                            home_title=get_content('home_title'),
                            home_subtitle=get_content('home_subtitle'),
                            home_value=get_content('home_value'),
-                           home_image=get_content('home_image'))
+                           home_image=get_content('home_image')))
 
 @app.route('/about')
 def about():
-    return render_template('about.html',
+    return cached_page('about', lambda: render_template('about.html',
                            about_story=get_content('about_story'),
-                           about_team=get_content('about_team'))
+                           about_team=get_content('about_team')))
 
 @app.route('/services')
 def services():
-    return render_template('services.html',
-                           s1_title=get_content('service1_title'),
-                           s1_desc=get_content('service1_desc'),
-                           s1_price=get_content('service1_price'),
-                           s2_title=get_content('service2_title'),
-                           s2_desc=get_content('service2_desc'),
-                           s2_price=get_content('service2_price'),
-                           s3_title=get_content('service3_title'),
-                           s3_desc=get_content('service3_desc'),
-                           s3_price=get_content('service3_price'),
-                           s1_image=get_content('service1_image'),
-                           s2_image=get_content('service2_image'),
-                           s3_image=get_content('service3_image'))
+    return cached_page('services', lambda: render_template('services.html', services=get_services()))
 
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
@@ -242,7 +933,7 @@ def contact():
         email = request.form['email']
         message = request.form['message']
         
-        conn = sqlite3.connect('blog.db')
+        conn = connect_db()
         c = conn.cursor()
         c.execute("INSERT INTO contact_messages (name, email, message) VALUES (?, ?, ?)",
                   (name, email, message))
@@ -256,12 +947,8 @@ def contact():
 
 @app.route('/blog')
 def blog():
-    conn = sqlite3.connect('blog.db')
-    c = conn.cursor()
-    c.execute("SELECT id, title, content, date, image_url FROM posts ORDER BY id DESC")
-    posts = c.fetchall()
-    conn.close()
-    return render_template('blog.html', posts=posts)
+    posts = iter_rows("SELECT id, title, content, date, image_url FROM posts ORDER BY id DESC")
+    return stream_page('blog.html', posts=posts)
 
 # === ADMIN SECTION ===
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -270,7 +957,7 @@ def admin_login():
         username = request.form['username']
         password = request.form['password']
         
-        conn = sqlite3.connect('blog.db')
+        conn = connect_db()
         c = conn.cursor()
         c.execute("SELECT id, password_hash, email_verified FROM admin_user WHERE username = ?", (username,))
         user = c.fetchone()
@@ -278,9 +965,7 @@ def admin_login():
         
         if user and check_password_hash(user[1], password):
             if user[2]:  # Check if email_verified is 1
-                session['logged_in'] = True
-                session['admin_username'] = username
-                session['admin_user_id'] = user[0]
+                session['sid'] = session_store.create(user[0])
                 flash("Login successful!", "success")
                 return redirect(url_for('admin_dashboard'))
             else:
@@ -294,7 +979,7 @@ def admin_login():
 @login_required
 @no_cache
 def admin_dashboard():
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
     
     # Get total messages and unread count
@@ -304,13 +989,12 @@ def admin_dashboard():
     c.execute("SELECT COUNT(*) FROM contact_messages WHERE read_status = 0")
     unread_count = c.fetchone()[0]
     
-    # Get all messages ordered by newest first
-    c.execute("SELECT id, name, email, message, timestamp, read_status FROM contact_messages ORDER BY timestamp DESC")
-    messages = c.fetchall()
-    
     conn.close()
     
-    return render_template('admin/dashboard.html',
+    # Stream all messages ordered by newest first
+    messages = iter_rows("SELECT id, name, email, message, timestamp, read_status FROM contact_messages ORDER BY timestamp DESC")
+    
+    return stream_page('admin/dashboard.html',
                            messages=messages,
                            total_messages=total_messages,
                            unread_count=unread_count)
@@ -319,6 +1003,7 @@ def admin_dashboard():
 @login_required
 @no_cache
 def admin_logout():
+    session_store.revoke(session['sid'])
     session.clear()  # Fully removes all session data
     return redirect(url_for('home'))  # Sends to public homepage
 
@@ -328,29 +1013,28 @@ def admin_logout():
 @no_cache
 def edit_home():
     if request.method == 'POST':
-        conn = sqlite3.connect('blog.db')
+        conn = connect_db()
         c = conn.cursor()
         c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form['title'], 'home_title'))
         c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form['subtitle'], 'home_subtitle'))
         c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form['value'], 'home_value'))
         
-        if 'home_image' in request.files:
-            file = request.files['home_image']
-            if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                c.execute("UPDATE page_content SET value=? WHERE key=?", (f"/static/uploads/{filename}", 'home_image'))
+        image_path = save_upload(request.files.get('home_image'))
+        if image_path:
+            c.execute("UPDATE page_content SET value=? WHERE key=?", (image_path, 'home_image'))
         
         conn.commit()
         conn.close()
+        invalidate_cache()
         flash("Homepage updated!", "success")
         return redirect(url_for('admin_dashboard'))
     
+    content = load_content()  # admin forms always read fresh values
     return render_template('admin/edit_home.html',
-                           title=get_content('home_title'),
-                           subtitle=get_content('home_subtitle'),
-                           value=get_content('home_value'),
-                           home_image=get_content('home_image'))
+                           title=content.get('home_title', ''),
+                           subtitle=content.get('home_subtitle', ''),
+                           value=content.get('home_value', ''),
+                           home_image=content.get('home_image', ''))
 
 # Edit About Us (no change)
 @app.route('/admin/edit-about', methods=['GET', 'POST'])
@@ -358,52 +1042,73 @@ def edit_home():
 @no_cache
 def edit_about():
     if request.method == 'POST':
-        conn = sqlite3.connect('blog.db')
+        conn = connect_db()
         c = conn.cursor()
         c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form['story'], 'about_story'))
         c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form['team'], 'about_team'))
         conn.commit()
         conn.close()
+        invalidate_cache()
         flash("About Us updated!", "success")
         return redirect(url_for('admin_dashboard'))
+    content = load_content()
     return render_template('admin/edit_about.html',
-                           about_story=get_content('about_story'),
-                           about_team=get_content('about_team'))
+                           about_story=content.get('about_story', ''),
+                           about_team=content.get('about_team', ''))
 
-# Edit Services (add image uploads later if needed)
+# Edit Services (list editor with image uploads)
 @app.route('/admin/edit-services', methods=['GET', 'POST'])
 @login_required
 @no_cache
 def edit_services():
     if request.method == 'POST':
-        conn = sqlite3.connect('blog.db')
+        conn = connect_db()
         c = conn.cursor()
-        for i in range(1, 4):
-            c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form[f's{i}_title'], f'service{i}_title'))
-            c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form[f's{i}_desc'], f'service{i}_desc'))
-            c.execute("UPDATE page_content SET value=? WHERE key=?", (request.form[f's{i}_price'], f'service{i}_price'))
+        for service_id in request.form.getlist('service_id'):
+            if f'delete_{service_id}' in request.form:
+                c.execute("DELETE FROM services WHERE id=?", (service_id,))
+                continue
+            c.execute("UPDATE services SET title=?, description=?, price=?, position=?, visible=? WHERE id=?",
+                      (request.form[f'title_{service_id}'],
+                       request.form[f'desc_{service_id}'],
+                       request.form[f'price_{service_id}'],
+                       request.form.get(f'position_{service_id}', type=int, default=0),
+                       1 if f'visible_{service_id}' in request.form else 0,
+                       service_id))
+            image_path = save_upload(request.files.get(f'image_{service_id}'))
+            if image_path:
+                c.execute("UPDATE services SET image_url=? WHERE id=?", (image_path, service_id))
+
+        # Optional new service row
+        new_title = request.form.get('title_new', '').strip()
+        if new_title:
+            image_path = save_upload(request.files.get('image_new'))
+            position = request.form.get('position_new', type=int)
+            if position is None:
+                c.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM services")
+                position = c.fetchone()[0]
+            c.execute("INSERT INTO services (title, description, price, image_url, position, visible) VALUES (?, ?, ?, ?, ?, ?)",
+                      (new_title,
+                       request.form.get('desc_new', ''),
+                       request.form.get('price_new', ''),
+                       image_path,
+                       position,
+                       1 if 'visible_new' in request.form else 0))
         conn.commit()
         conn.close()
+        invalidate_cache()
         flash("Services updated!", "success")
         return redirect(url_for('admin_dashboard'))
-    return render_template('admin/edit_services.html',
-                           s1_title=get_content('service1_title'),
-                           s1_desc=get_content('service1_desc'),
-                           s1_price=get_content('service1_price'),
-                           s2_title=get_content('service2_title'),
-                           s2_desc=get_content('service2_desc'),
-                           s2_price=get_content('service2_price'),
-                           s3_title=get_content('service3_title'),
-                           s3_desc=get_content('service3_desc'),
-                           s3_price=get_content('service3_price'))
+    return render_template('admin/edit_services.html', services=load_services(include_hidden=True))
 
 # Manage Blog - NOW FULLY WORKING WITH IMAGE UPLOAD
 @app.route('/admin/manage-blog', methods=['GET', 'POST'])
 @login_required
 @no_cache
 def manage_blog():
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
+    new_post_id = None
     
     if request.method == 'POST':
         if 'delete' in request.form:
@@ -413,30 +1118,54 @@ def manage_blog():
             title = request.form['title']
             content = request.form['content']
             date = datetime.now().strftime("%B %d, %Y")
-            image_path = None
-            
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename != '' and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    image_path = f"/static/uploads/{filename}"
+            image_path = save_upload(request.files.get('image'))
             
             c.execute("INSERT INTO posts (title, content, date, image_url) VALUES (?, ?, ?, ?)", 
                       (title, content, date, image_path))
+            new_post_id = c.lastrowid
             flash("New post published!", "success")
         conn.commit()
+    conn.close()
+
+    # Optimize a new upload in the background instead of during this request
+    if new_post_id and thumbnails.Image is not None:
+        job_id = create_image_job(g.site, new_post_id)
+        if job_id:
+            start_image_job(g.site, job_id)
     
-    c.execute("SELECT id, title, date, image_url FROM posts ORDER BY id DESC")
-    posts = c.fetchall()
+    posts = iter_rows("SELECT id, title, date, COALESCE(thumb_url, image_url) FROM posts ORDER BY id DESC")
+    return stream_page('admin/manage_blog.html', posts=posts)
+
+@app.route('/admin/image-jobs', methods=['GET', 'POST'])
+@login_required
+@no_cache
+def image_jobs():
+    if request.method == 'POST':
+        if thumbnails.Image is None:
+            flash("Image optimization needs Pillow (pip install Pillow).", "error")
+        else:
+            resume_image_jobs(g.site)  # a job whose runner stopped would otherwise block its images
+            job_id = create_image_job(g.site)
+            if job_id:
+                start_image_job(g.site, job_id)
+                flash("Image optimization started. Progress is shown below.", "success")
+            else:
+                flash("All blog images are already optimized.", "info")
+        return redirect(url_for('image_jobs'))
+
+    conn = connect_db()
+    c = conn.cursor()
+    c.execute("SELECT id, status, total, done, failed, created_at, updated_at FROM image_jobs ORDER BY id DESC LIMIT 20")
+    jobs = c.fetchall()
     conn.close()
-    return render_template('admin/manage_blog.html', posts=posts)
+    active = any(job[1] != 'done' for job in jobs)
+    return render_template('admin/image_jobs.html', jobs=jobs, active=active)
 
 @app.route('/admin/mark-read/<int:message_id>')
 @login_required
 @no_cache
 def mark_read(message_id):
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
     c.execute("UPDATE contact_messages SET read_status = 1 WHERE id = ?", (message_id,))
     conn.commit()
@@ -448,7 +1177,7 @@ def mark_read(message_id):
 @login_required
 @no_cache
 def delete_message(message_id):
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
     c.execute("DELETE FROM contact_messages WHERE id = ?", (message_id,))
     conn.commit()
@@ -460,11 +1189,12 @@ def delete_message(message_id):
 @login_required
 @no_cache
 def admin_profile():
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
+    user_id = g.admin_user_id
 
-    # Get current admin data
-    c.execute("SELECT username, email, email_verified FROM admin_user WHERE id = 1")
+    # Get current admin data (whoever is logged in)
+    c.execute("SELECT username, email, email_verified FROM admin_user WHERE id = ?", (user_id,))
     user = c.fetchone()
 
     if request.method == 'POST':
@@ -491,32 +1221,44 @@ def admin_profile():
         else:
             # 🔐 EMAIL CHANGE → VERIFY FIRST (PUT IT HERE)
             if new_email != user[1]:
+                token = secrets.token_urlsafe(16)
                 c.execute(
-                    "UPDATE admin_user SET email = ?, email_verified = 0 WHERE id = 1",
-                    (new_email,)
+                    "UPDATE admin_user SET email = ?, email_verified = 0, verification_token = ? WHERE id = ?",
+                    (new_email, token, user_id)
                 )
                 conn.commit()
+                conn.close()
 
-                send_verification_email(new_email)
-                flash("Verification code sent to new email.", "info")
-                return redirect(url_for('verify_email'))
+                # Unverified accounts cannot log in, so end every session including this one
+                session_store.revoke_user(user_id)
+                session.pop('sid', None)
+                send_verification_email(new_email, token)
+                flash("Verification link sent to your new email. Please verify it, then log in again.", "info")
+                return redirect(url_for('admin_login'))
 
             # Username update
             if new_username != user[0]:
                 c.execute(
-                    "UPDATE admin_user SET username = ? WHERE id = 1",
-                    (new_username,)
+                    "UPDATE admin_user SET username = ? WHERE id = ?",
+                    (new_username, user_id)
                 )
-                session['admin_username'] = new_username
 
             # Password update
             if new_password:
                 c.execute(
-                    "UPDATE admin_user SET password_hash = ? WHERE id = 1",
-                    (generate_password_hash(new_password),)
+                    "UPDATE admin_user SET password_hash = ? WHERE id = ?",
+                    (generate_password_hash(new_password), user_id)
                 )
 
             conn.commit()
+
+            # Log out this user everywhere else; refresh this session's cached username
+            if new_username != user[0] or new_password:
+                session_store.revoke_user(user_id, keep=session['sid'])
+                session_store.forget(session['sid'])
+
+            c.execute("SELECT username, email, email_verified FROM admin_user WHERE id = ?", (user_id,))
+            user = c.fetchone()
             flash("Profile updated successfully!", "success")
 
     conn.close()
@@ -532,7 +1274,7 @@ def admin_profile():
 @login_required
 @no_cache
 def manage_users():
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
 
     if request.method == 'POST':
@@ -564,7 +1306,7 @@ def manage_users():
 @login_required
 @no_cache
 def resend_verification(user_id):
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
     c.execute("SELECT email, verification_token FROM admin_user WHERE id = ?", (user_id,))
     user = c.fetchone()
@@ -586,11 +1328,11 @@ def resend_verification(user_id):
 @login_required
 @no_cache
 def delete_user(user_id):
-    conn = sqlite3.connect('blog.db')
+    conn = connect_db()
     c = conn.cursor()
 
     # Prevent self-deletion
-    if user_id == session.get('admin_user_id'):
+    if user_id == g.admin_user_id:
         flash("You cannot delete your own account.", "error")
         conn.close()
         return redirect(url_for('manage_users'))
@@ -605,6 +1347,7 @@ def delete_user(user_id):
     c.execute("DELETE FROM admin_user WHERE id = ?", (user_id,))
     conn.commit()
     conn.close()
+    session_store.revoke_user(user_id)
     flash("User deleted successfully!", "success")
     return redirect(url_for('manage_users'))
 
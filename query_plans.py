@@ -0,0 +1,243 @@
+# query_plans.py
+# Replays every route against a large seeded database, records each SQL
+# statement the app sends (through the connection pool's trace hook) and
+# checks it with EXPLAIN QUERY PLAN.
+#
+#     python query_plans.py            # report scans, temp B-trees and index hints
+#     python query_plans.py --update   # accept the current plans as the baseline
+#
+# tests/test_query_plans.py fails when a query that used an index starts
+# scanning or sorting, or when a new hot-path query scans from the start.
+import os
+import re
+import sys
+import json
+import sqlite3
+import tempfile
+from werkzeug.security import generate_password_hash
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'query_plans_baseline.json')
+
+# Rows seeded per table, large enough that a scan is clearly a scan
+SEED = {
+    'posts': 5000,
+    'contact_messages': 20000,
+    'admin_user': 500,
+    'services': 50,
+}
+
+HOST = 'query-plans.test'
+
+# Routes hit on ordinary page views and every admin request
+HOT_ROUTES = {
+    'GET /', 'GET /about', 'GET /services', 'GET /blog', 'POST /contact',
+    'POST /admin/login', 'GET /admin',
+}
+
+# (method, path, form data) for every route, in an order that keeps the session logged in
+REQUESTS = [
+    ('GET', '/', None),
+    ('GET', '/about', None),
+    ('GET', '/services', None),
+    ('GET', '/blog', None),
+    ('POST', '/contact', {'name': 'Query Plans', 'email': 'qp@example.com', 'message': 'Hello'}),
+    ('GET', '/verify-email/token-7', None),
+    ('POST', '/admin/login', {'username': 'admin', 'password': 'admin123'}),
+    ('GET', '/admin', None),
+    ('GET', '/admin/edit-home', None),
+    ('POST', '/admin/edit-home', {'title': 'T', 'subtitle': 'S', 'value': 'V'}),
+    ('GET', '/admin/edit-about', None),
+    ('POST', '/admin/edit-about', {'story': 'S', 'team': 'T'}),
+    ('GET', '/admin/edit-services', None),
+    ('POST', '/admin/edit-services', {'service_id': '1', 'title_1': 'T', 'desc_1': 'D', 'price_1': 'P',
+                                      'position_1': '1', 'visible_1': 'on', 'title_new': 'New', 'visible_new': 'on'}),
+    ('GET', '/admin/manage-blog', None),
+    ('POST', '/admin/manage-blog', {'title': 'T', 'content': 'C'}),
+    ('POST', '/admin/manage-blog', {'delete': '3'}),
+    ('GET', '/admin/image-jobs', None),
+    ('POST', '/admin/image-jobs', None),
+    ('GET', '/admin/mark-read/5', None),
+    ('GET', '/admin/delete-message/6', None),
+    ('GET', '/admin/profile', None),
+    ('POST', '/admin/profile', {'username': 'admin', 'email': 'admin@query-plans.test', 'password': '', 'confirm_password': ''}),
+    ('GET', '/admin/users', None),
+    ('POST', '/admin/users', {'username': 'query-plans', 'email': 'new@query-plans.test', 'password': 'x'}),
+    ('POST', '/admin/resend-verification/8', None),
+    ('POST', '/admin/delete-user/9', None),
+    ('GET', '/admin/logout', None),
+]
+
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def normalize(sql):
+    """Turn traced SQL (values already bound) back into one shape per query."""
+    return ' '.join(LITERAL.sub('?', sql).split())
+
+def seed_database(database, seed=SEED):
+    conn = sqlite3.connect(database)
+    c = conn.cursor()
+    c.execute("UPDATE admin_user SET email = 'admin@query-plans.test' WHERE username = 'admin'")
+    c.executemany("INSERT INTO posts (title, content, date, image_url) VALUES (?, ?, ?, ?)",
+                  [(f"Post {i}", "Body " * 50, "January 01, 2026", None) for i in range(seed['posts'])])
+    c.executemany("INSERT INTO contact_messages (name, email, message, timestamp, read_status) VALUES (?, ?, ?, ?, ?)",
+                  [(f"Client {i}", f"client{i}@example.com", "Hello " * 20,
+                    f"2026-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}", i % 2) for i in range(seed['contact_messages'])])
+    password_hash = generate_password_hash('x')
+    c.executemany("INSERT INTO admin_user (username, email, email_verified, verification_token, password_hash) VALUES (?, ?, ?, ?, ?)",
+                  [(f"user{i}", f"user{i}@example.com", i % 2, None if i % 2 else f"token-{i}", password_hash)
+                   for i in range(seed['admin_user'])])
+    c.executemany("INSERT INTO services (title, description, price, position) VALUES (?, ?, ?, ?)",
+                  [(f"Service {i}", "Description", "Price", i) for i in range(seed['services'])])
+    conn.commit()
+    conn.close()
+
+def collect_statements(workdir, seed=SEED):
+    """Run every route against a fresh seeded site in workdir; return ({sql: set of routes}, database path)."""
+    import app as cms
+
+    site = cms.Site('query-plans', [HOST], database=os.path.join(workdir, 'blog.db'))
+    cms.init_db(site.database)
+    seed_database(site.database, seed)
+
+    statements = {}
+    route = ['startup']
+
+    def trace(sql):
+        if sql.split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'):
+            statements.setdefault(normalize(sql), set()).add(route[0])
+
+    site.pool.trace = trace
+    cms.add_site(site)
+    send_verification_email = cms.send_verification_email
+    cms.send_verification_email = lambda *args: None  # never mail seeded users
+    try:
+        client = cms.app.test_client()
+        urls = cms.app.url_map.bind(HOST)
+        for method, path, data in REQUESTS:
+            rule, _ = urls.match(path, method, return_rule=True)
+            route[0] = f"{method} {rule.rule}"
+            response = client.open(path, method=method, data=data, base_url=f"http://{HOST}")
+            response.get_data()  # run streamed templates to the end
+            response.close()
+
+        route[0] = 'session sweep'
+        with cms.app.test_request_context(base_url=f"http://{HOST}"):
+            cms.session_store.sweep()
+    finally:
+        cms.send_verification_email = send_verification_email
+        site.pool.trace = None
+        cms.remove_site(site)  # also closes its pooled connections, so workdir can be removed
+    return statements, site.database
+
+SQL_WORDS = {'WHERE', 'ORDER', 'GROUP', 'LIMIT', 'JOIN', 'LEFT', 'INNER', 'ON', 'SET', 'VALUES'}
+
+def table_aliases(sql):
+    """Map each name the plan may show (table or alias) to its table."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_WORDS:
+            aliases[alias] = table
+    return aliases
+
+def suggest_index(sql, name, table):
+    """Rough index hint: columns of `name` compared in WHERE, then its first ORDER BY column."""
+    column = r'(?:(\w+)\.)?(\w+)'
+    columns = []
+    where = re.search(r'\bWHERE\b(.*?)(?:\bORDER BY\b|\bGROUP BY\b|\bLIMIT\b|$)', sql, re.I | re.S)
+    if where:
+        columns += re.findall(column + r'\s*(?:=|<|>|\bIN\b|\bLIKE\b)', where.group(1), re.I)
+    order = re.search(r'\bORDER BY\s+' + column, sql, re.I)
+    if order:
+        columns.append(order.groups())
+    # Keep unqualified columns and ones qualified with this table's name or alias
+    names = [col for qualifier, col in columns if qualifier in ('', None, name, table)]
+    names = [col for i, col in enumerate(names) if col not in names[:i] and col.lower() not in ('id', 'rowid')]
+    if not names:
+        return None
+    return f"CREATE INDEX ON {table} ({', '.join(names)})"
+
+def check_plans(seed=SEED):
+    """Return {sql: {'routes', 'hot', 'plan', 'scans', 'temp_btree', 'hints'}} for every statement."""
+    with tempfile.TemporaryDirectory(prefix='query-plans-') as workdir:
+        statements, database = collect_statements(workdir, seed)
+        return explain_statements(statements, database)
+
+def explain_statements(statements, database):
+    conn = sqlite3.connect(database)
+    results = {}
+    for sql, routes in sorted(statements.items()):
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, [None] * sql.count('?'))]
+        aliases = table_aliases(sql)
+        scanned = [re.match(r'SCAN (\w+)( USING)?', detail) for detail in plan]
+        scanned = [m for m in scanned if m and m.group(1) != 'CONSTANT']
+        scans = sorted({aliases.get(m.group(1), m.group(1)) for m in scanned})
+        # Only plain scans (no index at all) get a hint
+        hints = [suggest_index(sql, m.group(1), aliases.get(m.group(1), m.group(1))) for m in scanned if not m.group(2)]
+        results[sql] = {
+            'routes': sorted(routes),
+            'hot': bool(routes & HOT_ROUTES),
+            'plan': plan,
+            'scans': scans,
+            'temp_btree': any('TEMP B-TREE' in detail for detail in plan),
+            'hints': [hint for hint in hints if hint],
+        }
+    conn.close()
+    return results
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(results, path=BASELINE):
+    baseline = {sql: {'hot': r['hot'], 'scans': r['scans'], 'temp_btree': r['temp_btree'], 'plan': r['plan']}
+                for sql, r in results.items()}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def find_regressions(results, baseline):
+    """Statements that scan or sort where the baseline did not, plus new hot-path ones that do."""
+    problems = []
+    for sql, r in results.items():
+        before = baseline.get(sql)
+        if before is None:
+            if r['hot'] and (r['scans'] or r['temp_btree']):
+                problems.append(f"new hot-path query scans {r['scans']} / temp B-tree {r['temp_btree']}: {sql}")
+            continue
+        new_scans = sorted(set(r['scans']) - set(before['scans']))
+        if new_scans:
+            problems.append(f"regressed from index search to scan of {new_scans}: {sql}")
+        if r['temp_btree'] and not before['temp_btree']:
+            problems.append(f"now sorts in a temp B-tree: {sql}")
+    return problems
+
+def print_report(results):
+    flagged = {sql: r for sql, r in results.items() if r['scans'] or r['temp_btree']}
+    print(f"{len(results)} statements, {len(flagged)} with table scans or temp B-trees\n")
+    for sql, r in sorted(flagged.items(), key=lambda item: not item[1]['hot']):
+        print(f"[{'hot' if r['hot'] else 'cold'}] {sql}")
+        print(f"    routes: {', '.join(r['routes'])}")
+        for detail in r['plan']:
+            print(f"    plan:   {detail}")
+        for hint in r['hints']:
+            print(f"    hint:   {hint}")
+        print()
+
+def main(argv):
+    results = check_plans()
+    print_report(results)
+    if '--update' in argv:
+        save_baseline(results)
+        print(f"Baseline written to {BASELINE}")
+        return 0
+
+    problems = find_regressions(results, load_baseline())
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
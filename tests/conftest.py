@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.fixture
+def temp_site(tmp_path):
+    """Factory for throwaway sites: temp_site(name, host, **Site kwargs), each with its own database."""
+    import app as cms  # only the in-process tests need the app; the Playwright ones talk to a server
+
+    sites = []
+
+    def make(name, host, **kwargs):
+        kwargs.setdefault('database', str(tmp_path / f'{name}.db'))
+        site = cms.Site(name, [host], **kwargs)
+        cms.init_db(site.database)
+        cms.add_site(site)
+        sites.append(site)
+        return site
+
+    yield make
+    for site in sites:
+        cms.remove_site(site)
@@ -0,0 +1,14 @@
+from playwright.sync_api import Page
+
+def test_blog_is_compressed_and_streamed(page: Page):
+    response = page.request.get("http://127.0.0.1:5000/blog", headers={"Accept-Encoding": "gzip"})
+    assert response.ok
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert "content-length" not in response.headers  # streamed, so no length up front
+    assert "Blog & Insights" in response.text()
+
+def test_static_files_are_not_recompressed(page: Page):
+    response = page.request.get("http://127.0.0.1:5000/static/favicon.ico", headers={"Accept-Encoding": "gzip"})
+    assert response.ok
+    assert "content-encoding" not in response.headers
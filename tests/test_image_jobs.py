@@ -0,0 +1,20 @@
+from playwright.sync_api import Page, expect
+
+def test_start_image_optimization(page: Page):
+    # Log in as admin
+    page.goto("http://127.0.0.1:5000/admin/login")
+    page.fill("input[name=username]", "admin")
+    page.fill("input[name=password]", "admin123")
+    page.click("button[type=submit]")
+    expect(page).to_have_url("http://127.0.0.1:5000/admin")
+
+    # Start a job from the manage blog page
+    page.goto("http://127.0.0.1:5000/admin/manage-blog")
+    page.click("a[href='/admin/image-jobs']")
+    expect(page).to_have_url("http://127.0.0.1:5000/admin/image-jobs")
+    page.click('button:text("Optimize Existing Images")')
+
+    # The request returns right away, whether or not there was anything to do
+    expect(page).to_have_url("http://127.0.0.1:5000/admin/image-jobs")
+    expect(page.locator("text=Image optimization started").or_(
+        page.locator("text=All blog images are already optimized."))).to_be_visible()
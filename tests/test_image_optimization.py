@@ -0,0 +1,114 @@
+import io
+import os
+import time
+import sqlite3
+import pytest
+import app as cms
+import thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+HOST = 'images.test'
+
+@pytest.fixture
+def image_site(temp_site, tmp_path, monkeypatch):
+    # Uploads land in tmp_path/static/uploads/test-images
+    monkeypatch.chdir(tmp_path)
+    site = temp_site('test-images', HOST, upload_folder='static/uploads/test-images')
+    (tmp_path / site.upload_folder).mkdir(parents=True)
+    return site
+
+def png_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (1600, 900), (200, 80, 40)).save(buf, 'PNG')
+    return buf.getvalue()
+
+def wait_for_job(site, timeout=60):
+    """Return (status, done, failed) of the latest job once it finishes."""
+    conn = sqlite3.connect(site.database)
+    deadline = time.time() + timeout
+    try:
+        while time.time() < deadline:
+            row = conn.execute("SELECT status, done, failed FROM image_jobs ORDER BY id DESC LIMIT 1").fetchone()
+            if row and row[0] == 'done':
+                return row
+            time.sleep(0.2)
+        return row
+    finally:
+        conn.close()
+
+def post_urls(site, title):
+    conn = sqlite3.connect(site.database)
+    row = conn.execute("SELECT image_url, thumb_url FROM posts WHERE title = ?", (title,)).fetchone()
+    conn.close()
+    return row
+
+def log_in(client):
+    client.post('/admin/login', base_url=f'http://{HOST}', data={'username': 'admin', 'password': 'admin123'})
+
+def test_new_post_image_is_optimized(image_site, tmp_path):
+    client = cms.app.test_client()
+    log_in(client)
+    client.post('/admin/manage-blog', base_url=f'http://{HOST}', content_type='multipart/form-data',
+                data={'title': 'With image', 'content': 'Body', 'image': (io.BytesIO(png_bytes()), 'photo.png')}).get_data()
+
+    assert wait_for_job(image_site) == ('done', 1, 0)
+    image_url, thumb_url = post_urls(image_site, 'With image')
+    prefix = '/static/uploads/test-images/optimized/photo-'
+    assert image_url.startswith(prefix) and image_url.endswith('-display.webp')
+    assert thumb_url.startswith(prefix) and thumb_url.endswith('-thumb.webp')
+    assert (tmp_path / image_url.lstrip('/')).exists() and (tmp_path / thumb_url.lstrip('/')).exists()
+
+def test_stopped_job_is_restarted_from_jobs_page(image_site, tmp_path):
+    (tmp_path / image_site.upload_folder / 'old.png').write_bytes(png_bytes())
+    conn = sqlite3.connect(image_site.database)
+    c = conn.cursor()
+    c.execute("INSERT INTO posts (title, content, date, image_url) VALUES ('Old', 'Body', 'today', ?)",
+              (image_site.upload_url('old.png'),))
+    post_id = c.lastrowid
+    # A job whose runner died: still 'running', lease long expired, one item pending
+    c.execute("""INSERT INTO image_jobs (status, total, created_at, updated_at, claimed_until)
+                 VALUES ('running', 1, 'then', 'then', ?)""", (time.time() - 3600,))
+    c.execute("INSERT INTO image_job_items (job_id, post_id, source_url) VALUES (?, ?, ?)",
+              (c.lastrowid, post_id, image_site.upload_url('old.png')))
+    conn.commit()
+    conn.close()
+
+    client = cms.app.test_client()
+    log_in(client)
+    client.post('/admin/image-jobs', base_url=f'http://{HOST}')
+
+    assert wait_for_job(image_site) == ('done', 1, 0)
+    image_url, thumb_url = post_urls(image_site, 'Old')
+    assert image_url.endswith('-display.webp') and thumb_url.endswith('-thumb.webp')
+
+def optimize_or_crash(source_path, output_dir):
+    # Stands in for a Pillow segfault or an out-of-memory kill on one bad image
+    if os.path.basename(source_path).startswith('poison'):
+        os._exit(1)
+    return thumbnails.optimize_image(source_path, output_dir)
+
+def test_worker_crash_only_fails_the_bad_image(image_site, tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails, 'optimize_image', optimize_or_crash)
+    conn = sqlite3.connect(image_site.database)
+    for name in ('poison.png', 'good-1.png', 'good-2.png'):
+        (tmp_path / image_site.upload_folder / name).write_bytes(png_bytes())
+        conn.execute("INSERT INTO posts (title, content, date, image_url) VALUES (?, 'Body', 'today', ?)",
+                     (name, image_site.upload_url(name)))
+    conn.commit()
+    conn.close()
+
+    client = cms.app.test_client()
+    log_in(client)
+    client.post('/admin/image-jobs', base_url=f'http://{HOST}')
+
+    assert wait_for_job(image_site) == ('done', 2, 1)
+    for name in ('good-1.png', 'good-2.png'):
+        assert post_urls(image_site, name)[0].endswith('-display.webp')
+    assert post_urls(image_site, 'poison.png') == (image_site.upload_url('poison.png'), None)
+
+    # The broken pool was replaced, so a later upload is still optimized
+    client.post('/admin/manage-blog', base_url=f'http://{HOST}', content_type='multipart/form-data',
+                data={'title': 'After crash', 'content': 'Body', 'image': (io.BytesIO(png_bytes()), 'after.png')}).get_data()
+    assert wait_for_job(image_site) == ('done', 1, 0)
+    assert post_urls(image_site, 'After crash')[0].endswith('-display.webp')
@@ -0,0 +1,13 @@
+import tempfile
+import query_plans
+
+def test_queries_keep_their_indexes():
+    # Replays every route against a seeded database; see query_plans.py
+    results = query_plans.check_plans()
+    problems = query_plans.find_regressions(results, query_plans.load_baseline())
+    assert not problems, "\n".join(problems) + "\n\nIf intended, run: python query_plans.py --update"
+
+def test_check_removes_its_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    query_plans.check_plans(seed={'posts': 10, 'contact_messages': 10, 'admin_user': 10, 'services': 2})
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,36 @@
+import time
+from playwright.sync_api import Page, expect
+
+def test_add_and_hide_service(page: Page):
+    # Log in as admin
+    page.goto("http://127.0.0.1:5000/admin/login")
+    page.fill("input[name=username]", "admin")
+    page.fill("input[name=password]", "admin123")
+    page.click("button[type=submit]")
+    expect(page).to_have_url("http://127.0.0.1:5000/admin")
+
+    # Add a fourth service from the list editor
+    page.goto("http://127.0.0.1:5000/admin/edit-services")
+    unique_title = f"Test Service {time.time()}"
+    page.fill("input[name=title_new]", unique_title)
+    page.fill("textarea[name=desc_new]", "A service added by the test suite.")
+    page.fill("input[name=price_new]", "₱1,000")
+    page.click("button[type=submit]")
+
+    # Check that it shows on the public services page
+    page.goto("http://127.0.0.1:5000/services")
+    expect(page.locator(f"text={unique_title}")).to_be_visible()
+
+    # Hide it and check that it no longer shows publicly
+    page.goto("http://127.0.0.1:5000/admin/edit-services")
+    service_id = page.locator(f"input[value='{unique_title}']").get_attribute("name").split("_")[1]
+    page.uncheck(f"input[name=visible_{service_id}]")
+    page.click("button[type=submit]")
+
+    page.goto("http://127.0.0.1:5000/services")
+    expect(page.locator(f"text={unique_title}")).not_to_be_visible()
+
+    # Clean up
+    page.goto("http://127.0.0.1:5000/admin/edit-services")
+    page.check(f"input[name=delete_{service_id}]")
+    page.click("button[type=submit]")
@@ -0,0 +1,37 @@
+import sqlite3
+import app as cms
+
+def test_revocation_from_another_process_is_seen_at_once(temp_site):
+    site = temp_site('test-sessions', 'sessions.test')
+    client = cms.app.test_client()
+    client.post('/admin/login', base_url='http://sessions.test',
+                data={'username': 'admin', 'password': 'admin123'})
+    assert client.get('/admin', base_url='http://sessions.test').status_code == 200
+    assert client.get('/admin', base_url='http://sessions.test').status_code == 200  # cache hit
+
+    # Another worker deletes the session; this process's cache must not keep it alive
+    conn = sqlite3.connect(site.database)
+    conn.execute("DELETE FROM sessions")
+    conn.commit()
+    conn.close()
+
+    assert client.get('/admin', base_url='http://sessions.test').status_code == 302
+
+def test_unrelated_writes_keep_sessions_cached(temp_site):
+    site = temp_site('test-sessions', 'sessions.test')
+    client = cms.app.test_client()
+    client.post('/admin/login', base_url='http://sessions.test',
+                data={'username': 'admin', 'password': 'admin123'})
+    assert client.get('/admin', base_url='http://sessions.test').status_code == 200
+
+    # Content written by another worker (or by image-job progress) is not a revocation
+    conn = sqlite3.connect(site.database)
+    conn.execute("INSERT INTO contact_messages (name, email, message) VALUES ('A', 'a@example.com', 'Hi')")
+    conn.execute("UPDATE page_content SET value = 'New' WHERE key = 'home_title'")
+    conn.commit()
+    conn.close()
+
+    statements = []
+    site.pool.trace = statements.append
+    assert client.get('/admin', base_url='http://sessions.test').status_code == 200
+    assert not [sql for sql in statements if 'FROM sessions' in sql]
@@ -0,0 +1,45 @@
+import sqlite3
+import pytest
+from playwright.sync_api import Browser, expect
+from werkzeug.security import generate_password_hash
+
+@pytest.fixture(autouse=True)
+def session_user():
+    conn = sqlite3.connect('blog.db')
+    c = conn.cursor()
+    c.execute("DELETE FROM admin_user WHERE username = ?", ('sessionuser',))
+    c.execute("INSERT INTO admin_user (username, email, password_hash, email_verified) VALUES (?, ?, ?, ?)",
+              ('sessionuser', 'session@example.com', generate_password_hash('password123'), 1))
+    conn.commit()
+    conn.close()
+    yield
+    conn = sqlite3.connect('blog.db')
+    c = conn.cursor()
+    c.execute("DELETE FROM admin_user WHERE username = ?", ('sessionuser',))
+    conn.commit()
+    conn.close()
+
+def login(page, username, password):
+    page.goto("http://127.0.0.1:5000/admin/login")
+    page.fill("input[name=username]", username)
+    page.fill("input[name=password]", password)
+    page.click("button[type=submit]")
+    expect(page).to_have_url("http://127.0.0.1:5000/admin")
+
+def test_deleted_user_is_logged_out(browser: Browser):
+    # Two separate browsers: the admin and the user who gets deleted
+    admin = browser.new_context().new_page()
+    user = browser.new_context().new_page()
+    admin.on("dialog", lambda dialog: dialog.accept())
+
+    login(admin, "admin", "admin123")
+    login(user, "sessionuser", "password123")
+
+    # Delete the user while they are logged in
+    admin.goto("http://127.0.0.1:5000/admin/users")
+    admin.locator("tr", has_text="sessionuser").locator('button:text("Delete")').click()
+    expect(admin.locator("text=User deleted successfully!")).to_be_visible()
+
+    # Their very next request is sent to the login page
+    user.goto("http://127.0.0.1:5000/admin")
+    expect(user).to_have_url("http://127.0.0.1:5000/admin/login")
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import pytest
+import app as cms
+
+@pytest.fixture
+def two_sites(temp_site):
+    # Two temporary sites, each with its own database and branding
+    sites = [
+        temp_site('test-a', 'site-a.test', brand_name='Alpha Studio'),
+        temp_site('test-b', 'site-b.test', brand_name='Beta Works'),
+    ]
+    for site, title in zip(sites, ('Alpha home title', 'Beta home title')):
+        conn = sqlite3.connect(site.database)
+        conn.execute("UPDATE page_content SET value = ? WHERE key = 'home_title'", (title,))
+        conn.commit()
+        conn.close()
+    return sites
+
+def test_host_selects_site(two_sites):
+    client = cms.app.test_client()
+
+    a = client.get('/', base_url='http://site-a.test').get_data(as_text=True)
+    b = client.get('/', base_url='http://site-b.test:5000').get_data(as_text=True)
+    assert 'Alpha Studio' in a and 'Alpha home title' in a
+    assert 'Beta Works' in b and 'Beta home title' in b
+    assert 'Beta' not in a and 'Alpha' not in b
+
+    # Unknown hosts get the first configured site
+    other = client.get('/', base_url='http://unknown.test').get_data(as_text=True)
+    assert cms.SITES[0].brand_name in other
+
+def test_cached_page_changes_after_edit(two_sites):
+    client = cms.app.test_client()
+    assert 'Alpha home title' in client.get('/', base_url='http://site-a.test').get_data(as_text=True)
+
+    client.post('/admin/login', base_url='http://site-a.test',
+                data={'username': 'admin', 'password': 'admin123'}, follow_redirects=True).get_data()
+    client.post('/admin/edit-home', base_url='http://site-a.test',
+                data={'title': 'Edited title', 'subtitle': 'S', 'value': 'V'}, follow_redirects=True).get_data()
+
+    assert 'Edited title' in client.get('/', base_url='http://site-a.test').get_data(as_text=True)
+    assert 'Beta home title' in client.get('/', base_url='http://site-b.test').get_data(as_text=True)
+
+def test_upload_folder_must_be_under_static():
+    for folder in ('uploads/b', '/srv/uploads', 'static/../uploads'):
+        with pytest.raises(ValueError):
+            cms.Site('bad', ['bad.test'], upload_folder=folder)
+
+def test_example_config_starts(tmp_path, monkeypatch):
+    # sites.example.json copied as-is must load, including databases in subfolders
+    monkeypatch.setitem(cms.app.config, 'SITES_CONFIG', os.path.join(os.path.dirname(cms.__file__), 'sites.example.json'))
+    monkeypatch.chdir(tmp_path)
+    sites = cms.load_sites()
+    for site in sites:
+        cms.init_site(site)
+    assert [site.name for site in sites] == ['default', 'client-a']
+    assert (tmp_path / 'sites' / 'client-a.db').exists()
+    assert (tmp_path / 'static' / 'uploads' / 'client-a').is_dir()
@@ -0,0 +1,14 @@
+import app as cms
+
+def test_empty_dashboard_returns_connections_to_pool(temp_site):
+    site = temp_site('test-streaming', 'streaming.test')
+    client = cms.app.test_client()
+    client.post('/admin/login', base_url='http://streaming.test',
+                data={'username': 'admin', 'password': 'admin123'})
+    # The inbox is empty, so the template never iterates the streamed messages
+    for _ in range(3):
+        response = client.get('/admin', base_url='http://streaming.test')
+        assert 'No messages yet' in response.get_data(as_text=True)
+        response.close()
+    # Requests run one at a time, so the single pooled connection must be back
+    assert site.pool.idle.qsize() == 1
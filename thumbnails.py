@@ -0,0 +1,45 @@
+# thumbnails.py
+# Image work that runs inside the ProcessPoolExecutor. It lives outside app.py
+# so worker processes only need Pillow, not the Flask app, mail config or DB.
+import os
+import hashlib
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: image jobs are disabled without Pillow
+    Image = None
+
+# Variant name -> max width in pixels
+VARIANTS = {
+    'display': 1200,
+    'thumb': 400,
+}
+WEBP_QUALITY = 80
+
+def optimize_image(source_path, output_dir):
+    """Write WebP variants of one image and return {variant: filename}.
+
+    Output names include a hash of the source bytes, so running the same
+    image twice reuses the files already on disk.
+    """
+    with open(source_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+
+    filenames = {name: f"{stem}-{digest}-{name}.webp" for name in VARIANTS}
+    missing = [name for name in VARIANTS if not os.path.exists(os.path.join(output_dir, filenames[name]))]
+    if not missing:
+        return filenames
+
+    os.makedirs(output_dir, exist_ok=True)
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        for name in missing:
+            variant = img.copy()
+            variant.thumbnail((VARIANTS[name], VARIANTS[name] * 4))  # cap width, keep aspect ratio
+            path = os.path.join(output_dir, filenames[name])
+            variant.save(path + '.tmp', 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(path + '.tmp', path)  # never leave a half-written variant behind
+    return filenames